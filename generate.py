@@ -5,9 +5,11 @@ This script generates a complete set of Cherry MX switch footprints for various
 switch configurations and uses. I wrote it to make generating and changing my
 switch footprints manageable.
 """
+import argparse
+import os
 from collections import OrderedDict
 from copy import copy
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
 from jinja2 import Template
 
 
@@ -39,16 +41,62 @@ switch_symbol_outline = [
     {'x1': '7.54', 'y1': '-7.54', 'x2': '-7.54', 'y2': '-7.54', 'width': '0.254', 'layer': '94'},
     {'x1': '-7.54', 'y1': '-7.54', 'x2': '-7.54', 'y2': '7.54', 'width': '0.254', 'layer': '94'},
 ]
-switch_sizes = {
-    '1': {},
-    '2': {'lstab': -11.9, 'rstab': 11.9, 'tstab': 7, 'bstab': -8.24},
+keyboard_description = 'Keyboard Keyswitch PCB footprints for MX and Alps switches.'
+keyboard_sizes = ['1', '2', '4', '6', '-6', '6.25', '6.5', '7']
+stabilizer_overrides = {
+    # Measured spacings that differ from what switch_size() would compute.
     '4': {'lstab': -28.625, 'rstab': 28.625, 'tstab': 7, 'bstab': -8.24},
     '6': {'lstab': -57.15, 'rstab': 38.1, 'tstab': 7, 'bstab': -8.24},
     '-6': {'lstab': -38.1, 'rstab': 57.15, 'tstab': 7, 'bstab': -8.24},
     '6.25': {'lstab': -50, 'rstab': 50, 'tstab': 7, 'bstab': -8.24},
     '6.5': {'lstab': -52.5, 'rstab': 52.5, 'tstab': 7, 'bstab': -8.24},
-    '7': {'lstab': -57.15, 'rstab': 57.15, 'tstab': 7, 'bstab': -8.24}
 }
+switch_sizes = {}  # Filled in by switch_size() as sizes are requested
+
+
+def normalize_key_size(key_size):
+    """Return a key size written the same way every time, so '2.0' and '2' are one size.
+    """
+    try:
+        width = Decimal(key_size)
+    except InvalidOperation:
+        raise ValueError('Invalid key size: %s' % key_size)
+
+    if not width.is_finite():
+        raise ValueError('Invalid key size: %s' % key_size)
+
+    return '{:f}'.format(width.normalize())
+
+
+def switch_size(key_size):
+    """Return the stabilizer placement for a key size like '2.25'.
+
+    Keys under 2U have no stabilizer. 2U up to 3U use the short 11.9mm
+    stabilizer, and longer keys put the stabilizers one key apart from the
+    ends, up to the 66.675mm of the longest Cherry stabilizer wire. Negative
+    sizes are offset keys and must be listed in stabilizer_overrides.
+    """
+    key_size = normalize_key_size(key_size)
+
+    if key_size not in switch_sizes:
+        width = Decimal(key_size)
+
+        if key_size in stabilizer_overrides:
+            switch_sizes[key_size] = stabilizer_overrides[key_size]
+        elif width < 1:
+            raise ValueError('Key size must be at least 1U or a known offset size: %s' % key_size)
+        elif width < 2:
+            switch_sizes[key_size] = {}
+        else:
+            if width < 3:
+                spacing = Decimal('11.9')
+            else:
+                spacing = min((width - 1) * Decimal('9.525'), Decimal('66.675'))
+            switch_sizes[key_size] = {'lstab': -float(spacing), 'rstab': float(spacing), 'tstab': 7, 'bstab': -8.24}
+
+    return switch_sizes[key_size]
+
+
 connects = {
     'ALPS': [
         {'gate': 'G$1', 'pin': 'P0', 'pad': 'ALPS1'},
@@ -482,235 +530,285 @@ devices = {
     }
 }
 
-template = {
-    'description': 'Keyboard Keyswitch PCB footprints for MX and Alps switches.',
-    'packages': [],
-    'symbols': [],
-    'devicesets': []
-}
-packages = OrderedDict()
-
-# Fill in our template entries
-for device in sorted(devices):
-    template['symbols'].append(devices[device]['symbol'])
-    footprints = []
-    for switch_type in devices[device]['switch_types']:
-        for key_size in sorted(switch_sizes):
-            connections = copy(connects[switch_type])
-            footprint_name = '-%s-%sU' % (switch_type, key_size)
-            if devices[device]['diode']:
-                connections.insert(0, {'gate': 'G$1', 'pin': 'D-', 'pad': 'D-'})
-                connections.insert(0, {'gate': 'G$1', 'pin': 'D+', 'pad': 'D+'})
-                footprint_name = footprint_name + '-DIODE'
-            elif devices[device]['led'] == 'hole':
-                footprint_name = footprint_name + '-LEDHOLE'
-            elif devices[device]['led'] == 'rgb':
-                connections.insert(0, {'gate': 'G$1', 'pin': 'R-', 'pad': 'R-'})
-                connections.insert(0, {'gate': 'G$1', 'pin': 'LED+', 'pad': 'LED+'})
-                connections.insert(0, {'gate': 'G$1', 'pin': 'G-', 'pad': 'G-'})
-                connections.insert(0, {'gate': 'G$1', 'pin': 'B-', 'pad': 'B-'})
-                footprint_name = footprint_name + '-RGB'
-            elif devices[device]['led'] == 'single':
-                connections.insert(0, {'gate': 'G$1', 'pin': 'LED-', 'pad': 'LED-'})
-                connections.insert(0, {'gate': 'G$1', 'pin': 'LED+', 'pad': 'LED+'})
-                footprint_name = footprint_name + '-LED'
-            elif devices[device]['led'] == 'tht-hole':
-                connections.insert(0, {'gate': 'G$1', 'pin': 'LED-', 'pad': 'LED-'})
-                connections.insert(0, {'gate': 'G$1', 'pin': 'LED+', 'pad': 'LED+'})
-                footprint_name = footprint_name + '-LEDTHTHOLE'
-            elif devices[device]['led'] == 'single-smd':
-                connections.insert(0, {'gate': 'G$1', 'pin': 'LED-', 'pad': 'SMDLED-'})
-                connections.insert(0, {'gate': 'G$1', 'pin': 'LED+', 'pad': 'SMDLED+'})
-                footprint_name = footprint_name + '-SMDLED'
-            elif devices[device]['led'] == 'single-tht-smd':
-                connections.insert(0, {'gate': 'G$1', 'pin': 'LED-', 'pad': 'LED- SMDLED-'})
-                connections.insert(0, {'gate': 'G$1', 'pin': 'LED+', 'pad': 'LED+ SMDLED+'})
-                footprint_name = footprint_name + '-THTSMDLED'
-            elif devices[device]['led'] == 'rgb-smd':
-                connections.insert(0, {'gate': 'G$1', 'pin': 'R-', 'pad': 'R-'})
-                connections.insert(0, {'gate': 'G$1', 'pin': 'LED+', 'pad': 'LED+'})
-                connections.insert(0, {'gate': 'G$1', 'pin': 'G-', 'pad': 'G-'})
-                connections.insert(0, {'gate': 'G$1', 'pin': 'B-', 'pad': 'B-'})
-                footprint_name = footprint_name + '-SMDRGB'
-            package_name = footprint_name[1:]
-            if '--' in package_name:
-                package_name = package_name.replace('--', '-REVERSED-')
-            packages[package_name] = copy(devices[device])
-            packages[package_name].update({'name': package_name, 'device': device, 'switch_type': switch_type, 'size': key_size, 'style': 'NORMAL'})
-            footprints.append({
-                'name': footprint_name,
-                'package': package_name,
-                'connects': connections
-            })
-            if key_size != '1':
-                for style in ('FLIPPED', 'FLIPPED-ROTATED', 'ROTATED'):
-                    package = '-'.join((package_name, style))
-                    packages[package] = copy(devices[device])
-                    packages[package].update({'name': package, 'device': device, 'switch_type': switch_type, 'size': key_size, 'style': style})
-                    footprints.append({
-                        'name': '-'.join((footprint_name, style)),
-                        'package': package,
-                        'connects': connections
-                    })
-    template['devicesets'].append({
-        'name': 'KEYSWITCH-' + device,
-        'devices': footprints
-    })
-
-schematic_script = []
-board_script = ['grid mm 19.05;', 'grid alt mm 4.7625;']
-current_x = Decimal('0')
-current_x_mm = Decimal('0')
-current_y = Decimal('0')
-current_y_mm = Decimal('0')
-last_row = None
-
-for package in packages:
-    pkg = packages[package]
-    #pprint(pkg)
-    current_row = pkg['symbol']['name'] + '-' + pkg['name'].split('-')[0]
-    if current_row != last_row:
-        current_x = Decimal('0')
-        current_x_mm = Decimal('0')
-        current_y += Decimal('1.5')
-        current_y_mm += Decimal('38.1')
-    last_row = current_row
-    if 'FLIPPED' in pkg['name']:
-        schematic_script.append('ADD *%s-%s %s (%s -%s);' % (pkg['symbol']['name'], pkg['name'], pkg['name'], current_x, current_y + Decimal('0.75')))
-        board_script.append('MOVE %s (%s -%s);' % (pkg['name'], current_x_mm, current_y_mm + Decimal('19.05')))
-    current_x += Decimal('0.75')
-    if 'FLIPPED' not in pkg['name']:
-        current_x_mm += Decimal('19.05') * abs(Decimal(pkg['size']))
-        schematic_script.append('ADD *%s-%s %s (%s -%s);' % (pkg['symbol']['name'], pkg['name'], pkg['name'], current_x, current_y))
-        board_script.append('MOVE %s (%s -%s);' % (pkg['name'], current_x_mm, current_y_mm))
-
-    template['packages'].append({
-        'name': pkg['name'],
-        'description': 'Keyboard switch package!',
-        'wires': copy(package_wires[pkg['switch_type']]),
-        'holes': copy(package_holes[pkg['switch_type']]),
-        'pads': copy(package_pads[pkg['switch_type']]),
-        'smds': copy(package_smds[pkg['switch_type']]),
-        'labels': []
-    })
-    label_offset = '-2.8'
-    if pkg['switch_type'] in ['CHOC', 'CHOCX', 'X']:
-        template['packages'][-1]['labels'].append({'value': 'LED', 'x': '0', 'y': '-4.8', 'size': '1', 'layer': '47', 'align': 'center'})
-        label_offset = '-6.215'
-    elif pkg['led'] in ['rgb-smd']:
-        label_offset = '-7'
-    elif pkg['led'] in ['hole']:
-        label_offset = '-3.215'
-    template['packages'][-1]['labels'].append({'value': '&gt;NAME', 'x': '0', 'y': label_offset, 'size': '1', 'layer': '21', 'align': 'center'})
-    template['packages'][-1]['labels'].append({'value': '&gt;NAME', 'x': '0', 'y': label_offset, 'size': '1', 'layer': '22', 'align': 'center', 'rot': 'MR0'})
-
-    if pkg['diode']:
-        template['packages'][-1]['pads'].append({'name': 'D+', 'x': '-3.81', 'y': '-5.08', 'drill': '1', 'diameter': '2'})
-        template['packages'][-1]['labels'].append({'value': '+', 'x': '-1.905', 'y': '-5.08', 'size': '1', 'layer': '21', 'align': 'center'})
-        template['packages'][-1]['labels'].append({'value': '+', 'x': '-1.905', 'y': '-5.08', 'size': '1', 'layer': '22', 'align': 'center', 'rot': 'MR0'})
-        template['packages'][-1]['pads'].append({'name': 'D-', 'x': '3.81', 'y': '-5.08', 'drill': '1', 'diameter': '2', 'shape': 'square'})
-        template['packages'][-1]['labels'].append({'value': '-', 'x': '1.905', 'y': '-5.08', 'size': '1', 'layer': '21', 'align': 'center'})
-        template['packages'][-1]['labels'].append({'value': '-', 'x': '1.905', 'y': '-5.08', 'size': '1', 'layer': '22', 'align': 'center', 'rot': 'MR0'})
-    elif pkg['led'] == 'single':
-        template['packages'][-1]['pads'].append({'name': 'LED+', 'x': '-1.27', 'y': '-5.08', 'drill': '1', 'diameter': '2'})
-        template['packages'][-1]['labels'].append({'value': '+', 'x': '-3.175', 'y': '-5.08', 'size': '1', 'layer': '21', 'align': 'center'})
-        template['packages'][-1]['labels'].append({'value': '+', 'x': '-3.175', 'y': '-5.08', 'size': '1', 'layer': '22', 'align': 'center', 'rot': 'MR0'})
-        template['packages'][-1]['pads'].append({'name': 'LED-', 'x': '1.27', 'y': '-5.08', 'drill': '1', 'diameter': '2', 'shape': 'square'})
-        template['packages'][-1]['labels'].append({'value': '-', 'x': '3.175', 'y': '-5.08', 'size': '1', 'layer': '21', 'align': 'center'})
-        template['packages'][-1]['labels'].append({'value': '-', 'x': '3.175', 'y': '-5.08', 'size': '1', 'layer': '22', 'align': 'center', 'rot': 'MR0'})
-    elif pkg['led'] == 'single-smd':
-        template['packages'][-1]['smds'].append({'name': 'SMDLED+', 'x': '-1.3', 'y': '-5.75', 'dx': '2', 'dy': '1.75', 'layer': '1'})
-        template['packages'][-1]['labels'].append({'value': '+', 'x': '-3.175', 'y': '-5.75', 'size': '1', 'layer': '21', 'align': 'center'})
-        template['packages'][-1]['smds'].append({'name': 'SMDLED-', 'x': '1.3', 'y': '-5.75', 'dx': '2', 'dy': '1.75', 'layer': '1'})
-        template['packages'][-1]['labels'].append({'value': '-', 'x': '3.175', 'y': '-5.75', 'size': '1', 'layer': '21', 'align': 'center'})
-    elif pkg['led'] == 'single-tht-smd':
-        template['packages'][-1]['pads'].append({'name': 'LED+', 'x': '-1.27', 'y': '-5.08', 'drill': '1', 'diameter': '2'})
-        template['packages'][-1]['labels'].append({'value': '+', 'x': '-3.175', 'y': '-5.08', 'size': '1', 'layer': '21', 'align': 'center'})
-        template['packages'][-1]['labels'].append({'value': '+', 'x': '-3.175', 'y': '-5.08', 'size': '1', 'layer': '22', 'align': 'center', 'rot': 'MR0'})
-        template['packages'][-1]['pads'].append({'name': 'LED-', 'x': '1.27', 'y': '-5.08', 'drill': '1', 'diameter': '2', 'shape': 'square'})
-        template['packages'][-1]['labels'].append({'value': '-', 'x': '3.175', 'y': '-5.08', 'size': '1', 'layer': '21', 'align': 'center'})
-        template['packages'][-1]['labels'].append({'value': '-', 'x': '3.175', 'y': '-5.08', 'size': '1', 'layer': '22', 'align': 'center', 'rot': 'MR0'})
-        template['packages'][-1]['smds'].append({'name': 'SMDLED+', 'x': '-1.3', 'y': '-6.785', 'dx': '2', 'dy': '1.3', 'layer': '1'})
-        template['packages'][-1]['labels'].append({'value': '+', 'x': '-3.175', 'y': '-6.785', 'size': '1', 'layer': '21', 'align': 'center'})
-        template['packages'][-1]['smds'].append({'name': 'SMDLED-', 'x': '1.3', 'y': '-6.785', 'dx': '2', 'dy': '1.3', 'layer': '1'})
-        template['packages'][-1]['labels'].append({'value': '-', 'x': '3.175', 'y': '-6.785', 'size': '1', 'layer': '21', 'align': 'center'})
-    elif pkg['led'] == 'rgb-smd':
-        template['packages'][-1]['holes'].append({'x': '0', 'y': '-4.5', 'diameter': '2.4'})
-        template['packages'][-1]['smds'].append({'name': 'LED+', 'x': '2.1', 'y': '-3.775', 'dx': '1', 'dy': '0.75', 'layer': '16'})
-        template['packages'][-1]['smds'].append({'name': 'R-', 'x': '-2.1', 'y': '-3.775', 'dx': '1', 'dy': '0.75', 'layer': '16'})
-        template['packages'][-1]['smds'].append({'name': 'G-', 'x': '-2.1', 'y': '-5.225', 'dx': '1', 'dy': '0.75', 'layer': '16'})
-        template['packages'][-1]['smds'].append({'name': 'B-', 'x': '2.1', 'y': '-5.225', 'dx': '1', 'dy': '0.75', 'layer': '16'})
-        template['packages'][-1]['wires'].append({'x1': '-1.6', 'y1': '-5.9', 'x2': '-1.6', 'y2': '-3.9', 'width': '0.125', 'layer': '22'})
-        template['packages'][-1]['wires'].append({'x1': '-0.8', 'y1': '-3.1', 'x2': '-1.6', 'y2': '-3.9', 'width': '0.125', 'layer': '22'})
-        template['packages'][-1]['wires'].append({'x1': '-0.8', 'y1': '-3.1', 'x2': '1.6', 'y2': '-3.1', 'width': '0.125', 'layer': '22'})
-        template['packages'][-1]['wires'].append({'x1': '1.6', 'y1': '-3.1', 'x2': '1.6', 'y2': '-5.9', 'width': '0.125', 'layer': '22'})
-        template['packages'][-1]['wires'].append({'x1': '1.6', 'y1': '-5.9', 'x2': '-1.6', 'y2': '-5.9', 'width': '0.125', 'layer': '22'})
-    elif pkg['led'] == 'rgb':
-        template['packages'][-1]['pads'].append({'name': 'R-', 'x': '-3.81', 'y': '-5.08', 'drill': '1', 'diameter': '2'})
-        template['packages'][-1]['labels'].append({'value': 'R-', 'x': '-3.955', 'y': '-6.985', 'size': '1', 'layer': '21', 'align': 'center'})
-        template['packages'][-1]['labels'].append({'value': 'R-', 'x': '-3.955', 'y': '-6.985', 'size': '1', 'layer': '22', 'align': 'center', 'rot': 'MR0'})
-        template['packages'][-1]['pads'].append({'name': 'LED+', 'x': '-1.27', 'y': '-5.08', 'drill': '1', 'diameter': '2', 'shape': 'square'})
-        template['packages'][-1]['labels'].append({'value': '+', 'x': '-1.125', 'y': '-6.985', 'size': '1', 'layer': '21', 'align': 'center'})
-        template['packages'][-1]['labels'].append({'value': '+', 'x': '-1.125', 'y': '-6.985', 'size': '1', 'layer': '22', 'align': 'center', 'rot': 'MR0'})
-        template['packages'][-1]['pads'].append({'name': 'G-', 'x': '1.27', 'y': '-5.08', 'drill': '1', 'diameter': '2'})
-        template['packages'][-1]['labels'].append({'value': 'G-', 'x': '1.125', 'y': '-6.985', 'size': '1', 'layer': '21', 'align': 'center'})
-        template['packages'][-1]['labels'].append({'value': 'G-', 'x': '1.125', 'y': '-6.985', 'size': '1', 'layer': '22', 'align': 'center', 'rot': 'MR0'})
-        template['packages'][-1]['pads'].append({'name': 'B-', 'x': '3.81', 'y': '-5.08', 'drill': '1', 'diameter': '2'})
-        template['packages'][-1]['labels'].append({'value': 'B-', 'x': '3.955', 'y': '-6.985', 'size': '1', 'layer': '21', 'align': 'center'})
-        template['packages'][-1]['labels'].append({'value': 'B-', 'x': '3.955', 'y': '-6.985', 'size': '1', 'layer': '22', 'align': 'center', 'rot': 'MR0'})
-    elif pkg['led'] == 'hole':
-        template['packages'][-1]['wires'].append({'x1': '-4.31', 'y1': '-4.83', 'x2': '-3.81', 'y2': '-4.33', 'width': '0', 'layer': '20', 'curve': '-90'})
-        template['packages'][-1]['wires'].append({'x1': '-3.81', 'y1': '-4.33', 'x2': '3.81', 'y2': '-4.33', 'width': '0', 'layer': '20'})
-        template['packages'][-1]['wires'].append({'x1': '3.81', 'y1': '-4.33', 'x2': '4.31', 'y2': '-4.83', 'width': '0', 'layer': '20', 'curve': '-90'})
-        template['packages'][-1]['wires'].append({'x1': '4.31', 'y1': '-4.83', 'x2': '4.31', 'y2': '-5.33', 'width': '0', 'layer': '20'})
-        template['packages'][-1]['wires'].append({'x1': '4.31', 'y1': '-5.33', 'x2': '3.81', 'y2': '-5.83', 'width': '0', 'layer': '20', 'curve': '-90'})
-        template['packages'][-1]['wires'].append({'x1': '3.81', 'y1': '-5.83', 'x2': '-3.81', 'y2': '-5.83', 'width': '0', 'layer': '20'})
-        template['packages'][-1]['wires'].append({'x1': '-3.81', 'y1': '-5.83', 'x2': '-4.31', 'y2': '-5.33', 'width': '0', 'layer': '20', 'curve': '-90'})
-        template['packages'][-1]['wires'].append({'x1': '-4.31', 'y1': '-5.33', 'x2': '-4.31', 'y2': '-4.83', 'width': '0', 'layer': '20'})
-    elif pkg['led'] == 'tht-hole':
-        template['packages'][-1]['pads'].append({'name': 'LED+', 'x': '-1.27', 'y': '-5.08', 'drill': '1', 'diameter': '2'})
-        template['packages'][-1]['labels'].append({'value': '+', 'x': '-3.175', 'y': '-5.08', 'size': '1', 'layer': '21', 'align': 'center'})
-        template['packages'][-1]['labels'].append({'value': '+', 'x': '-3.175', 'y': '-5.08', 'size': '1', 'layer': '22', 'align': 'center', 'rot': 'MR0'})
-        template['packages'][-1]['pads'].append({'name': 'LED-', 'x': '1.27', 'y': '-5.08', 'drill': '1', 'diameter': '2', 'shape': 'square'})
-        template['packages'][-1]['labels'].append({'value': '-', 'x': '3.175', 'y': '-5.08', 'size': '1', 'layer': '21', 'align': 'center'})
-        template['packages'][-1]['labels'].append({'value': '-', 'x': '3.175', 'y': '-5.08', 'size': '1', 'layer': '22', 'align': 'center', 'rot': 'MR0'})
-        template['packages'][-1]['wires'].append({'x1':'-0.8', 'y1':'-4.58', 'x2':'-0.3', 'y2':'-4.08', 'width':'0', 'layer':'20', 'curve':'-90'})
-        template['packages'][-1]['wires'].append({'x1':'-0.3', 'y1':'-4.08', 'x2':'0.3', 'y2':'-4.08', 'width':'0', 'layer':'20'})
-        template['packages'][-1]['wires'].append({'x1':'0.3', 'y1':'-4.08', 'x2':'0.8', 'y2':'-4.58', 'width':'0', 'layer':'20', 'curve':'-90'})
-        template['packages'][-1]['wires'].append({'x1':'0.8', 'y1':'-4.58', 'x2':'0.8', 'y2':'-5.58', 'width':'0', 'layer':'20'})
-        template['packages'][-1]['wires'].append({'x1':'0.8', 'y1':'-5.58', 'x2':'0.3', 'y2':'-6.08', 'width':'0', 'layer':'20', 'curve':'-90'})
-        template['packages'][-1]['wires'].append({'x1':'0.3', 'y1':'-6.08', 'x2':'-0.3', 'y2':'-6.08', 'width':'0', 'layer':'20'})
-        template['packages'][-1]['wires'].append({'x1':'-0.3', 'y1':'-6.08', 'x2':'-0.8', 'y2':'-5.58', 'width':'0', 'layer':'20', 'curve':'-90'})
-        template['packages'][-1]['wires'].append({'x1':'-0.8', 'y1':'-5.58', 'x2':'-0.8', 'y2':'-4.58', 'width':'0', 'layer':'20'})
-
-    if pkg['size'] != '1':
-        c = switch_sizes[pkg['size']]
-        if pkg['style'] == 'FLIPPED':
-            template['packages'][-1]['holes'].append({'x': c['lstab'], 'y': -c['tstab'], 'diameter': '3.05'})
-            template['packages'][-1]['holes'].append({'x': c['rstab'], 'y': -c['tstab'], 'diameter': '3.05'})
-            template['packages'][-1]['holes'].append({'x': c['lstab'], 'y': -c['bstab'], 'diameter': '4'})
-            template['packages'][-1]['holes'].append({'x': c['rstab'], 'y': -c['bstab'], 'diameter': '4'})
-        elif pkg['style'] == 'FLIPPED-ROTATED':
-            template['packages'][-1]['holes'].append({'y': c['lstab'], 'x': -c['tstab'], 'diameter': '3.05'})
-            template['packages'][-1]['holes'].append({'y': c['rstab'], 'x': -c['tstab'], 'diameter': '3.05'})
-            template['packages'][-1]['holes'].append({'y': c['lstab'], 'x': -c['bstab'], 'diameter': '4'})
-            template['packages'][-1]['holes'].append({'y': c['rstab'], 'x': -c['bstab'], 'diameter': '4'})
-        elif pkg['style'] == 'ROTATED':
-            template['packages'][-1]['holes'].append({'y': c['lstab'], 'x': c['tstab'], 'diameter': '3.05'})
-            template['packages'][-1]['holes'].append({'y': c['rstab'], 'x': c['tstab'], 'diameter': '3.05'})
-            template['packages'][-1]['holes'].append({'y': c['lstab'], 'x': c['bstab'], 'diameter': '4'})
-            template['packages'][-1]['holes'].append({'y': c['rstab'], 'x': c['bstab'], 'diameter': '4'})
-        else:
-            template['packages'][-1]['holes'].append({'x': c['lstab'], 'y': c['tstab'], 'diameter': '3.05'})
-            template['packages'][-1]['holes'].append({'x': c['rstab'], 'y': c['tstab'], 'diameter': '3.05'})
-            template['packages'][-1]['holes'].append({'x': c['lstab'], 'y': c['bstab'], 'diameter': '4'})
-            template['packages'][-1]['holes'].append({'x': c['rstab'], 'y': c['bstab'], 'diameter': '4'})
+
+def build_template(key_sizes, device_names=None, switch_types=None, description=keyboard_description):
+    """Build the template context for a library with only the requested parts.
+
+    Packages are only generated for the key sizes, devices and switch types
+    asked for, so a project library can use any size without growing
+    Keyboard.lbr. Returns (template, schematic_script, board_script).
+    """
+    template = {
+        'description': description,
+        'packages': [],
+        'symbols': [],
+        'devicesets': []
+    }
+    packages = OrderedDict()
+
+    # Fill in our template entries
+    for device in sorted(device_names or devices):
+        if switch_types and not set(switch_types) & set(devices[device]['switch_types']):
+            continue
+        template['symbols'].append(devices[device]['symbol'])
+        footprints = []
+        for switch_type in devices[device]['switch_types']:
+            if switch_types and switch_type not in switch_types:
+                continue
+            for key_size in sorted(key_sizes):
+                connections = copy(connects[switch_type])
+                footprint_name = '-%s-%sU' % (switch_type, key_size)
+                if devices[device]['diode']:
+                    connections.insert(0, {'gate': 'G$1', 'pin': 'D-', 'pad': 'D-'})
+                    connections.insert(0, {'gate': 'G$1', 'pin': 'D+', 'pad': 'D+'})
+                    footprint_name = footprint_name + '-DIODE'
+                elif devices[device]['led'] == 'hole':
+                    footprint_name = footprint_name + '-LEDHOLE'
+                elif devices[device]['led'] == 'rgb':
+                    connections.insert(0, {'gate': 'G$1', 'pin': 'R-', 'pad': 'R-'})
+                    connections.insert(0, {'gate': 'G$1', 'pin': 'LED+', 'pad': 'LED+'})
+                    connections.insert(0, {'gate': 'G$1', 'pin': 'G-', 'pad': 'G-'})
+                    connections.insert(0, {'gate': 'G$1', 'pin': 'B-', 'pad': 'B-'})
+                    footprint_name = footprint_name + '-RGB'
+                elif devices[device]['led'] == 'single':
+                    connections.insert(0, {'gate': 'G$1', 'pin': 'LED-', 'pad': 'LED-'})
+                    connections.insert(0, {'gate': 'G$1', 'pin': 'LED+', 'pad': 'LED+'})
+                    footprint_name = footprint_name + '-LED'
+                elif devices[device]['led'] == 'tht-hole':
+                    connections.insert(0, {'gate': 'G$1', 'pin': 'LED-', 'pad': 'LED-'})
+                    connections.insert(0, {'gate': 'G$1', 'pin': 'LED+', 'pad': 'LED+'})
+                    footprint_name = footprint_name + '-LEDTHTHOLE'
+                elif devices[device]['led'] == 'single-smd':
+                    connections.insert(0, {'gate': 'G$1', 'pin': 'LED-', 'pad': 'SMDLED-'})
+                    connections.insert(0, {'gate': 'G$1', 'pin': 'LED+', 'pad': 'SMDLED+'})
+                    footprint_name = footprint_name + '-SMDLED'
+                elif devices[device]['led'] == 'single-tht-smd':
+                    connections.insert(0, {'gate': 'G$1', 'pin': 'LED-', 'pad': 'LED- SMDLED-'})
+                    connections.insert(0, {'gate': 'G$1', 'pin': 'LED+', 'pad': 'LED+ SMDLED+'})
+                    footprint_name = footprint_name + '-THTSMDLED'
+                elif devices[device]['led'] == 'rgb-smd':
+                    connections.insert(0, {'gate': 'G$1', 'pin': 'R-', 'pad': 'R-'})
+                    connections.insert(0, {'gate': 'G$1', 'pin': 'LED+', 'pad': 'LED+'})
+                    connections.insert(0, {'gate': 'G$1', 'pin': 'G-', 'pad': 'G-'})
+                    connections.insert(0, {'gate': 'G$1', 'pin': 'B-', 'pad': 'B-'})
+                    footprint_name = footprint_name + '-SMDRGB'
+                package_name = footprint_name[1:]
+                if '--' in package_name:
+                    package_name = package_name.replace('--', '-REVERSED-')
+                packages[package_name] = copy(devices[device])
+                packages[package_name].update({'name': package_name, 'device': device, 'switch_type': switch_type, 'size': key_size, 'style': 'NORMAL'})
+                footprints.append({
+                    'name': footprint_name,
+                    'package': package_name,
+                    'connects': connections
+                })
+                if switch_size(key_size):
+                    for style in ('FLIPPED', 'FLIPPED-ROTATED', 'ROTATED'):
+                        package = '-'.join((package_name, style))
+                        packages[package] = copy(devices[device])
+                        packages[package].update({'name': package, 'device': device, 'switch_type': switch_type, 'size': key_size, 'style': style})
+                        footprints.append({
+                            'name': '-'.join((footprint_name, style)),
+                            'package': package,
+                            'connects': connections
+                        })
+        template['devicesets'].append({
+            'name': 'KEYSWITCH-' + device,
+            'devices': footprints
+        })
+
+    schematic_script = []
+    board_script = ['grid mm 19.05;', 'grid alt mm 4.7625;']
+    current_x = Decimal('0')
+    current_x_mm = Decimal('0')
+    current_y = Decimal('0')
+    current_y_mm = Decimal('0')
+    last_row = None
+
+    for package in packages:
+        pkg = packages[package]
+        #pprint(pkg)
+        current_row = pkg['symbol']['name'] + '-' + pkg['name'].split('-')[0]
+        if current_row != last_row:
+            current_x = Decimal('0')
+            current_x_mm = Decimal('0')
+            current_y += Decimal('1.5')
+            current_y_mm += Decimal('38.1')
+        last_row = current_row
+        if 'FLIPPED' in pkg['name']:
+            schematic_script.append('ADD *%s-%s %s (%s -%s);' % (pkg['symbol']['name'], pkg['name'], pkg['name'], current_x, current_y + Decimal('0.75')))
+            board_script.append('MOVE %s (%s -%s);' % (pkg['name'], current_x_mm, current_y_mm + Decimal('19.05')))
+        current_x += Decimal('0.75')
+        if 'FLIPPED' not in pkg['name']:
+            current_x_mm += Decimal('19.05') * abs(Decimal(pkg['size']))
+            schematic_script.append('ADD *%s-%s %s (%s -%s);' % (pkg['symbol']['name'], pkg['name'], pkg['name'], current_x, current_y))
+            board_script.append('MOVE %s (%s -%s);' % (pkg['name'], current_x_mm, current_y_mm))
+
+        template['packages'].append({
+            'name': pkg['name'],
+            'description': 'Keyboard switch package!',
+            'wires': copy(package_wires[pkg['switch_type']]),
+            'holes': copy(package_holes[pkg['switch_type']]),
+            'pads': copy(package_pads[pkg['switch_type']]),
+            'smds': copy(package_smds[pkg['switch_type']]),
+            'labels': []
+        })
+        label_offset = '-2.8'
+        if pkg['switch_type'] in ['CHOC', 'CHOCX', 'X']:
+            template['packages'][-1]['labels'].append({'value': 'LED', 'x': '0', 'y': '-4.8', 'size': '1', 'layer': '47', 'align': 'center'})
+            label_offset = '-6.215'
+        elif pkg['led'] in ['rgb-smd']:
+            label_offset = '-7'
+        elif pkg['led'] in ['hole']:
+            label_offset = '-3.215'
+        template['packages'][-1]['labels'].append({'value': '&gt;NAME', 'x': '0', 'y': label_offset, 'size': '1', 'layer': '21', 'align': 'center'})
+        template['packages'][-1]['labels'].append({'value': '&gt;NAME', 'x': '0', 'y': label_offset, 'size': '1', 'layer': '22', 'align': 'center', 'rot': 'MR0'})
+
+        if pkg['diode']:
+            template['packages'][-1]['pads'].append({'name': 'D+', 'x': '-3.81', 'y': '-5.08', 'drill': '1', 'diameter': '2'})
+            template['packages'][-1]['labels'].append({'value': '+', 'x': '-1.905', 'y': '-5.08', 'size': '1', 'layer': '21', 'align': 'center'})
+            template['packages'][-1]['labels'].append({'value': '+', 'x': '-1.905', 'y': '-5.08', 'size': '1', 'layer': '22', 'align': 'center', 'rot': 'MR0'})
+            template['packages'][-1]['pads'].append({'name': 'D-', 'x': '3.81', 'y': '-5.08', 'drill': '1', 'diameter': '2', 'shape': 'square'})
+            template['packages'][-1]['labels'].append({'value': '-', 'x': '1.905', 'y': '-5.08', 'size': '1', 'layer': '21', 'align': 'center'})
+            template['packages'][-1]['labels'].append({'value': '-', 'x': '1.905', 'y': '-5.08', 'size': '1', 'layer': '22', 'align': 'center', 'rot': 'MR0'})
+        elif pkg['led'] == 'single':
+            template['packages'][-1]['pads'].append({'name': 'LED+', 'x': '-1.27', 'y': '-5.08', 'drill': '1', 'diameter': '2'})
+            template['packages'][-1]['labels'].append({'value': '+', 'x': '-3.175', 'y': '-5.08', 'size': '1', 'layer': '21', 'align': 'center'})
+            template['packages'][-1]['labels'].append({'value': '+', 'x': '-3.175', 'y': '-5.08', 'size': '1', 'layer': '22', 'align': 'center', 'rot': 'MR0'})
+            template['packages'][-1]['pads'].append({'name': 'LED-', 'x': '1.27', 'y': '-5.08', 'drill': '1', 'diameter': '2', 'shape': 'square'})
+            template['packages'][-1]['labels'].append({'value': '-', 'x': '3.175', 'y': '-5.08', 'size': '1', 'layer': '21', 'align': 'center'})
+            template['packages'][-1]['labels'].append({'value': '-', 'x': '3.175', 'y': '-5.08', 'size': '1', 'layer': '22', 'align': 'center', 'rot': 'MR0'})
+        elif pkg['led'] == 'single-smd':
+            template['packages'][-1]['smds'].append({'name': 'SMDLED+', 'x': '-1.3', 'y': '-5.75', 'dx': '2', 'dy': '1.75', 'layer': '1'})
+            template['packages'][-1]['labels'].append({'value': '+', 'x': '-3.175', 'y': '-5.75', 'size': '1', 'layer': '21', 'align': 'center'})
+            template['packages'][-1]['smds'].append({'name': 'SMDLED-', 'x': '1.3', 'y': '-5.75', 'dx': '2', 'dy': '1.75', 'layer': '1'})
+            template['packages'][-1]['labels'].append({'value': '-', 'x': '3.175', 'y': '-5.75', 'size': '1', 'layer': '21', 'align': 'center'})
+        elif pkg['led'] == 'single-tht-smd':
+            template['packages'][-1]['pads'].append({'name': 'LED+', 'x': '-1.27', 'y': '-5.08', 'drill': '1', 'diameter': '2'})
+            template['packages'][-1]['labels'].append({'value': '+', 'x': '-3.175', 'y': '-5.08', 'size': '1', 'layer': '21', 'align': 'center'})
+            template['packages'][-1]['labels'].append({'value': '+', 'x': '-3.175', 'y': '-5.08', 'size': '1', 'layer': '22', 'align': 'center', 'rot': 'MR0'})
+            template['packages'][-1]['pads'].append({'name': 'LED-', 'x': '1.27', 'y': '-5.08', 'drill': '1', 'diameter': '2', 'shape': 'square'})
+            template['packages'][-1]['labels'].append({'value': '-', 'x': '3.175', 'y': '-5.08', 'size': '1', 'layer': '21', 'align': 'center'})
+            template['packages'][-1]['labels'].append({'value': '-', 'x': '3.175', 'y': '-5.08', 'size': '1', 'layer': '22', 'align': 'center', 'rot': 'MR0'})
+            template['packages'][-1]['smds'].append({'name': 'SMDLED+', 'x': '-1.3', 'y': '-6.785', 'dx': '2', 'dy': '1.3', 'layer': '1'})
+            template['packages'][-1]['labels'].append({'value': '+', 'x': '-3.175', 'y': '-6.785', 'size': '1', 'layer': '21', 'align': 'center'})
+            template['packages'][-1]['smds'].append({'name': 'SMDLED-', 'x': '1.3', 'y': '-6.785', 'dx': '2', 'dy': '1.3', 'layer': '1'})
+            template['packages'][-1]['labels'].append({'value': '-', 'x': '3.175', 'y': '-6.785', 'size': '1', 'layer': '21', 'align': 'center'})
+        elif pkg['led'] == 'rgb-smd':
+            template['packages'][-1]['holes'].append({'x': '0', 'y': '-4.5', 'diameter': '2.4'})
+            template['packages'][-1]['smds'].append({'name': 'LED+', 'x': '2.1', 'y': '-3.775', 'dx': '1', 'dy': '0.75', 'layer': '16'})
+            template['packages'][-1]['smds'].append({'name': 'R-', 'x': '-2.1', 'y': '-3.775', 'dx': '1', 'dy': '0.75', 'layer': '16'})
+            template['packages'][-1]['smds'].append({'name': 'G-', 'x': '-2.1', 'y': '-5.225', 'dx': '1', 'dy': '0.75', 'layer': '16'})
+            template['packages'][-1]['smds'].append({'name': 'B-', 'x': '2.1', 'y': '-5.225', 'dx': '1', 'dy': '0.75', 'layer': '16'})
+            template['packages'][-1]['wires'].append({'x1': '-1.6', 'y1': '-5.9', 'x2': '-1.6', 'y2': '-3.9', 'width': '0.125', 'layer': '22'})
+            template['packages'][-1]['wires'].append({'x1': '-0.8', 'y1': '-3.1', 'x2': '-1.6', 'y2': '-3.9', 'width': '0.125', 'layer': '22'})
+            template['packages'][-1]['wires'].append({'x1': '-0.8', 'y1': '-3.1', 'x2': '1.6', 'y2': '-3.1', 'width': '0.125', 'layer': '22'})
+            template['packages'][-1]['wires'].append({'x1': '1.6', 'y1': '-3.1', 'x2': '1.6', 'y2': '-5.9', 'width': '0.125', 'layer': '22'})
+            template['packages'][-1]['wires'].append({'x1': '1.6', 'y1': '-5.9', 'x2': '-1.6', 'y2': '-5.9', 'width': '0.125', 'layer': '22'})
+        elif pkg['led'] == 'rgb':
+            template['packages'][-1]['pads'].append({'name': 'R-', 'x': '-3.81', 'y': '-5.08', 'drill': '1', 'diameter': '2'})
+            template['packages'][-1]['labels'].append({'value': 'R-', 'x': '-3.955', 'y': '-6.985', 'size': '1', 'layer': '21', 'align': 'center'})
+            template['packages'][-1]['labels'].append({'value': 'R-', 'x': '-3.955', 'y': '-6.985', 'size': '1', 'layer': '22', 'align': 'center', 'rot': 'MR0'})
+            template['packages'][-1]['pads'].append({'name': 'LED+', 'x': '-1.27', 'y': '-5.08', 'drill': '1', 'diameter': '2', 'shape': 'square'})
+            template['packages'][-1]['labels'].append({'value': '+', 'x': '-1.125', 'y': '-6.985', 'size': '1', 'layer': '21', 'align': 'center'})
+            template['packages'][-1]['labels'].append({'value': '+', 'x': '-1.125', 'y': '-6.985', 'size': '1', 'layer': '22', 'align': 'center', 'rot': 'MR0'})
+            template['packages'][-1]['pads'].append({'name': 'G-', 'x': '1.27', 'y': '-5.08', 'drill': '1', 'diameter': '2'})
+            template['packages'][-1]['labels'].append({'value': 'G-', 'x': '1.125', 'y': '-6.985', 'size': '1', 'layer': '21', 'align': 'center'})
+            template['packages'][-1]['labels'].append({'value': 'G-', 'x': '1.125', 'y': '-6.985', 'size': '1', 'layer': '22', 'align': 'center', 'rot': 'MR0'})
+            template['packages'][-1]['pads'].append({'name': 'B-', 'x': '3.81', 'y': '-5.08', 'drill': '1', 'diameter': '2'})
+            template['packages'][-1]['labels'].append({'value': 'B-', 'x': '3.955', 'y': '-6.985', 'size': '1', 'layer': '21', 'align': 'center'})
+            template['packages'][-1]['labels'].append({'value': 'B-', 'x': '3.955', 'y': '-6.985', 'size': '1', 'layer': '22', 'align': 'center', 'rot': 'MR0'})
+        elif pkg['led'] == 'hole':
+            template['packages'][-1]['wires'].append({'x1': '-4.31', 'y1': '-4.83', 'x2': '-3.81', 'y2': '-4.33', 'width': '0', 'layer': '20', 'curve': '-90'})
+            template['packages'][-1]['wires'].append({'x1': '-3.81', 'y1': '-4.33', 'x2': '3.81', 'y2': '-4.33', 'width': '0', 'layer': '20'})
+            template['packages'][-1]['wires'].append({'x1': '3.81', 'y1': '-4.33', 'x2': '4.31', 'y2': '-4.83', 'width': '0', 'layer': '20', 'curve': '-90'})
+            template['packages'][-1]['wires'].append({'x1': '4.31', 'y1': '-4.83', 'x2': '4.31', 'y2': '-5.33', 'width': '0', 'layer': '20'})
+            template['packages'][-1]['wires'].append({'x1': '4.31', 'y1': '-5.33', 'x2': '3.81', 'y2': '-5.83', 'width': '0', 'layer': '20', 'curve': '-90'})
+            template['packages'][-1]['wires'].append({'x1': '3.81', 'y1': '-5.83', 'x2': '-3.81', 'y2': '-5.83', 'width': '0', 'layer': '20'})
+            template['packages'][-1]['wires'].append({'x1': '-3.81', 'y1': '-5.83', 'x2': '-4.31', 'y2': '-5.33', 'width': '0', 'layer': '20', 'curve': '-90'})
+            template['packages'][-1]['wires'].append({'x1': '-4.31', 'y1': '-5.33', 'x2': '-4.31', 'y2': '-4.83', 'width': '0', 'layer': '20'})
+        elif pkg['led'] == 'tht-hole':
+            template['packages'][-1]['pads'].append({'name': 'LED+', 'x': '-1.27', 'y': '-5.08', 'drill': '1', 'diameter': '2'})
+            template['packages'][-1]['labels'].append({'value': '+', 'x': '-3.175', 'y': '-5.08', 'size': '1', 'layer': '21', 'align': 'center'})
+            template['packages'][-1]['labels'].append({'value': '+', 'x': '-3.175', 'y': '-5.08', 'size': '1', 'layer': '22', 'align': 'center', 'rot': 'MR0'})
+            template['packages'][-1]['pads'].append({'name': 'LED-', 'x': '1.27', 'y': '-5.08', 'drill': '1', 'diameter': '2', 'shape': 'square'})
+            template['packages'][-1]['labels'].append({'value': '-', 'x': '3.175', 'y': '-5.08', 'size': '1', 'layer': '21', 'align': 'center'})
+            template['packages'][-1]['labels'].append({'value': '-', 'x': '3.175', 'y': '-5.08', 'size': '1', 'layer': '22', 'align': 'center', 'rot': 'MR0'})
+            template['packages'][-1]['wires'].append({'x1':'-0.8', 'y1':'-4.58', 'x2':'-0.3', 'y2':'-4.08', 'width':'0', 'layer':'20', 'curve':'-90'})
+            template['packages'][-1]['wires'].append({'x1':'-0.3', 'y1':'-4.08', 'x2':'0.3', 'y2':'-4.08', 'width':'0', 'layer':'20'})
+            template['packages'][-1]['wires'].append({'x1':'0.3', 'y1':'-4.08', 'x2':'0.8', 'y2':'-4.58', 'width':'0', 'layer':'20', 'curve':'-90'})
+            template['packages'][-1]['wires'].append({'x1':'0.8', 'y1':'-4.58', 'x2':'0.8', 'y2':'-5.58', 'width':'0', 'layer':'20'})
+            template['packages'][-1]['wires'].append({'x1':'0.8', 'y1':'-5.58', 'x2':'0.3', 'y2':'-6.08', 'width':'0', 'layer':'20', 'curve':'-90'})
+            template['packages'][-1]['wires'].append({'x1':'0.3', 'y1':'-6.08', 'x2':'-0.3', 'y2':'-6.08', 'width':'0', 'layer':'20'})
+            template['packages'][-1]['wires'].append({'x1':'-0.3', 'y1':'-6.08', 'x2':'-0.8', 'y2':'-5.58', 'width':'0', 'layer':'20', 'curve':'-90'})
+            template['packages'][-1]['wires'].append({'x1':'-0.8', 'y1':'-5.58', 'x2':'-0.8', 'y2':'-4.58', 'width':'0', 'layer':'20'})
+
+        c = switch_size(pkg['size'])
+        if c:
+            if pkg['style'] == 'FLIPPED':
+                template['packages'][-1]['holes'].append({'x': c['lstab'], 'y': -c['tstab'], 'diameter': '3.05'})
+                template['packages'][-1]['holes'].append({'x': c['rstab'], 'y': -c['tstab'], 'diameter': '3.05'})
+                template['packages'][-1]['holes'].append({'x': c['lstab'], 'y': -c['bstab'], 'diameter': '4'})
+                template['packages'][-1]['holes'].append({'x': c['rstab'], 'y': -c['bstab'], 'diameter': '4'})
+            elif pkg['style'] == 'FLIPPED-ROTATED':
+                template['packages'][-1]['holes'].append({'y': c['lstab'], 'x': -c['tstab'], 'diameter': '3.05'})
+                template['packages'][-1]['holes'].append({'y': c['rstab'], 'x': -c['tstab'], 'diameter': '3.05'})
+                template['packages'][-1]['holes'].append({'y': c['lstab'], 'x': -c['bstab'], 'diameter': '4'})
+                template['packages'][-1]['holes'].append({'y': c['rstab'], 'x': -c['bstab'], 'diameter': '4'})
+            elif pkg['style'] == 'ROTATED':
+                template['packages'][-1]['holes'].append({'y': c['lstab'], 'x': c['tstab'], 'diameter': '3.05'})
+                template['packages'][-1]['holes'].append({'y': c['rstab'], 'x': c['tstab'], 'diameter': '3.05'})
+                template['packages'][-1]['holes'].append({'y': c['lstab'], 'x': c['bstab'], 'diameter': '4'})
+                template['packages'][-1]['holes'].append({'y': c['rstab'], 'x': c['bstab'], 'diameter': '4'})
+            else:
+                template['packages'][-1]['holes'].append({'x': c['lstab'], 'y': c['tstab'], 'diameter': '3.05'})
+                template['packages'][-1]['holes'].append({'x': c['rstab'], 'y': c['tstab'], 'diameter': '3.05'})
+                template['packages'][-1]['holes'].append({'x': c['lstab'], 'y': c['bstab'], 'diameter': '4'})
+                template['packages'][-1]['holes'].append({'x': c['rstab'], 'y': c['bstab'], 'diameter': '4'})
+
+    return template, schematic_script, board_script
+
+
+def render_library(template):
+    """Render a template context from build_template() into library XML.
+    """
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Keyboard.lbr.jinja2')) as fd:
+        return Template(fd.read()).render(**template)
+
 
 if __name__ == '__main__':
-    t = Template(open('Keyboard.lbr.jinja2').read())
-    with open('Keyboard.lbr', 'w') as fd:
-        fd.seek(0, 0)
-        fd.write(t.render(**template))
+    parser = argparse.ArgumentParser(description='Generate an EAGLE library of keyboard switch footprints.')
+    parser.add_argument('-s', '--sizes', default=','.join(keyboard_sizes), help='Comma separated key sizes to generate, such as 1,1.25,2.25')
+    parser.add_argument('-d', '--devices', help='Comma separated devices to generate, such as PLAIN,DIODE (Default: all)')
+    parser.add_argument('-t', '--switch-types', help='Comma separated switch types to generate, such as MX,ALPSMX (Default: all)')
+    parser.add_argument('-o', '--output', default='Keyboard.lbr', help='File to write the library to')
+    args = parser.parse_args()
+
+    device_names = list(OrderedDict.fromkeys(args.devices.split(','))) if args.devices else None
+    switch_types = list(OrderedDict.fromkeys(args.switch_types.split(','))) if args.switch_types else None
+
+    for device in device_names or []:
+        if device not in devices:
+            parser.error('Unknown device %s, choose from %s' % (device, ', '.join(sorted(devices))))
+
+    for switch_type in switch_types or []:
+        if switch_type not in connects:
+            parser.error('Unknown switch type %s, choose from %s' % (switch_type, ', '.join(sorted(connects))))
+
+    try:
+        key_sizes = list(OrderedDict.fromkeys(normalize_key_size(key_size) for key_size in args.sizes.split(',')))
+        for key_size in key_sizes:
+            switch_size(key_size)
+    except ValueError as e:
+        parser.error(str(e))
+
+    template, schematic_script, board_script = build_template(key_sizes, device_names, switch_types)
+
+    if not template['packages']:
+        parser.error('None of the devices %s support the switch types %s' % (', '.join(device_names or sorted(devices)), ', '.join(switch_types or sorted(connects))))
+
+    with open(args.output, 'w') as fd:
+        fd.write(render_library(template))
 
     #print('*** You can use this script to add every single footprint to a schematic:')
     #print('\n'.join(schematic_script))
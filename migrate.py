@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""Migrate EAGLE designs away from the deprecated Controller.lbr.
+
+Every package in every library is reduced to a geometric fingerprint of its
+copper (pads, SMDs and holes), normalized for position and rotation. Devices
+are indexed in a dictionary by their package fingerprint and connections, so
+finding the replacement for each Controller.lbr device is a single lookup
+instead of comparing every package against every other package. A part only
+moves when both its device and its package can move to the same place, so the
+schematic and board stay in sync.
+
+Schematics and boards are rewritten line by line so that even very large
+designs are never held in memory. References to Controller.lbr are pointed at
+the replacement library and the replacement parts are embedded in the design.
+
+Usage:
+
+    ./migrate.py --mapping              # Show what Controller.lbr maps to
+    ./migrate.py -n board.sch board.brd # Show what would change
+    ./migrate.py board.sch board.brd    # Rewrite the files in place
+"""
+import argparse
+import os
+import re
+import sys
+from xml.etree import ElementTree
+
+
+deprecated_library = 'Controller'
+library_dir = os.path.dirname(os.path.abspath(__file__))
+attribute_re = re.compile(r'(\w+)="([^"]*)"')
+library_start_re = re.compile(r'^\s*<library name="([^"]*)"')
+item_start_re = re.compile(r'^\s*<(package|symbol|deviceset) name="([^"]*)"')
+section_end_re = re.compile(r'^\s*</(packages|symbols|devicesets)>')
+sections = ('packages', 'symbols', 'devicesets')
+
+
+def rotation(rot):
+    """Return the angle in degrees from an EAGLE rot attribute like "MR90".
+    """
+    if not rot:
+        return 0
+
+    return int(float(rot.lstrip('MSR')))
+
+
+def copper_features(package):
+    """Return the pads, SMDs and holes of a package as plain tuples.
+
+    Each feature is (kind, name, x, y, width, height, drill, extra, angle,
+    period). SMD widths and heights already account for right angle rotation
+    and angle holds whatever rotation is left over. Pad angles account for
+    mirroring and are reduced to the pad shape's symmetry, which is period
+    degrees: 90 for round, square and octagon pads, 180 for long pads and 360
+    for offset pads. A period of 0 means the angle does not change when the
+    package is rotated.
+    """
+    features = []
+
+    for pad in package.iter('pad'):
+        diameter = float(pad.get('diameter', '0'))
+        shape = pad.get('shape', 'round')
+        period = {'long': 180, 'offset': 360}.get(shape, 90)
+        angle = rotation(pad.get('rot'))
+        if 'M' in pad.get('rot', ''):
+            angle = 180 - angle
+        features.append(('pad', pad.get('name'), float(pad.get('x')), float(pad.get('y')), diameter, diameter, float(pad.get('drill')), shape, angle % period, period))
+
+    for smd in package.iter('smd'):
+        dx, dy = float(smd.get('dx')), float(smd.get('dy'))
+        angle = rotation(smd.get('rot')) % 180
+        if angle >= 90:
+            dx, dy = dy, dx
+        features.append(('smd', smd.get('name'), float(smd.get('x')), float(smd.get('y')), dx, dy, 0.0, smd.get('layer'), angle % 90, 0))
+
+    for hole in package.iter('hole'):
+        drill = float(hole.get('drill'))
+        features.append(('hole', '', float(hole.get('x')), float(hole.get('y')), drill, drill, drill, '', 0, 0))
+
+    return features
+
+
+def fingerprint(package):
+    """Return a position and rotation independent fingerprint for a package.
+
+    The copper is centered on its centroid and tried at 0, 90, 180 and 270
+    degrees. The smallest of the four sorted feature lists is the fingerprint,
+    so the same footprint drawn in any of those orientations fingerprints the
+    same. Packages without any copper return None.
+    """
+    features = copper_features(package)
+
+    if not features:
+        return None
+
+    center_x = sum(f[2] for f in features) / len(features)
+    center_y = sum(f[3] for f in features) / len(features)
+    features = [(f[0], f[1], f[2] - center_x, f[3] - center_y) + f[4:] for f in features]
+    candidates = []
+
+    for quarter_turns in range(4):
+        candidates.append(tuple(sorted((f[0], f[1], round(f[2], 2) + 0.0, round(f[3], 2) + 0.0) + f[4:] for f in features)))
+        features = [(f[0], f[1], -f[3], f[2], f[5], f[4], f[6], f[7], (f[8] + 90) % f[9] if f[9] else f[8], f[9]) for f in features]
+
+    return min(candidates)
+
+
+def connections(device):
+    """Return the gate/pin/pad connections of a device as a frozenset.
+    """
+    return frozenset((c.get('gate'), c.get('pin'), c.get('pad')) for c in device.iter('connect'))
+
+
+def load_libraries(directory):
+    """Parse every .lbr file in directory and return {name: library element}.
+    """
+    libraries = {}
+
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith('.lbr'):
+            tree = ElementTree.parse(os.path.join(directory, filename))
+            libraries[filename[:-4]] = tree.find('drawing/library')
+
+    return libraries
+
+
+def package_fingerprints(library):
+    """Return {package name: fingerprint} for every package in a library.
+    """
+    return {package.get('name'): fingerprint(package) for package in library.iterfind('packages/package')}
+
+
+def build_index(libraries):
+    """Index the devices of every non-deprecated library.
+
+    Returns a dict mapping (package fingerprint, connections) to a list of
+    (library, deviceset name, device name, package name).
+    """
+    device_index = {}
+
+    for library_name, library in libraries.items():
+        if library_name == deprecated_library:
+            continue
+
+        fingerprints = package_fingerprints(library)
+        for deviceset in library.iterfind('devicesets/deviceset'):
+            for device in deviceset.iterfind('devices/device'):
+                package_fingerprint = fingerprints.get(device.get('package'))
+                if package_fingerprint:
+                    key = (package_fingerprint, connections(device))
+                    device_index.setdefault(key, []).append((library_name, deviceset.get('name'), device.get('name'), device.get('package')))
+
+    return device_index
+
+
+def name_score(candidate, names):
+    """Count how many of the old (deviceset, device, package) names a candidate shares.
+    """
+    return sum(1 for old, new in zip(names, candidate[1:]) if old == new)
+
+
+def best_match(candidates, *names):
+    """Pick the candidate whose trailing names match the old ones most closely.
+    """
+    if not candidates:
+        return None
+
+    return max(candidates, key=lambda candidate: name_score(candidate, names))
+
+
+def build_mapping(libraries):
+    """Map every Controller.lbr device and package to its replacement.
+
+    Returns (packages, devices, held_packages, held_devices).
+
+    devices maps (deviceset, device) to (library, deviceset name, device name,
+    package name). A replacement must have the same copper and connections
+    and share at least one name with the old device, since a header and an LED
+    can have the same pads.
+
+    packages maps an old package name to (library, package name) and is taken
+    from devices. A package only moves when every device using it moves to
+    the same package, and a device only moves when its package does, so a
+    .sch part and its .brd element always move together.
+
+    held_packages and held_devices map the packages and devices that are left
+    alone despite a candidate replacement to the reason why.
+    """
+    device_index = build_index(libraries)
+    controller = libraries[deprecated_library]
+    fingerprints = package_fingerprints(controller)
+    devices = {}
+    held_devices = {}
+    device_packages = {}
+    targets = {}
+
+    for deviceset in controller.iterfind('devicesets/deviceset'):
+        for device in deviceset.iterfind('devices/device'):
+            old = (deviceset.get('name'), device.get('name'))
+            names = old + (device.get('package'),)
+            match = best_match(device_index.get((fingerprints.get(device.get('package')), connections(device))), *names)
+
+            if match and name_score(match, names):
+                devices[old] = match
+            elif match:
+                held_devices[old] = 'COPPER ONLY MATCH %s.lbr %s%s (left alone)' % match[:3]
+
+            if device.get('package'):
+                device_packages[old] = device.get('package')
+                targets.setdefault(device.get('package'), set()).add((match[0], match[3]) if old in devices else None)
+
+    packages = {}
+    held_packages = {}
+
+    for package_name, package_targets in targets.items():
+        if len(package_targets - {None}) > 1:
+            held_packages[package_name] = 'AMBIGUOUS, its devices move to different packages (left alone)'
+        elif None in package_targets and len(package_targets) > 1:
+            held_packages[package_name] = 'HELD BACK, some devices using it have no replacement (left alone)'
+        elif None not in package_targets:
+            packages[package_name] = package_targets.pop()
+
+    for old, package_name in device_packages.items():
+        if old in devices and package_name not in packages:
+            held_devices[old] = 'HELD BACK, its package %s stays on %s.lbr (left alone)' % (package_name, deprecated_library)
+            del devices[old]
+
+    return packages, devices, held_packages, held_devices
+
+
+def find_references(filename):
+    """Yield the attributes of every part or element that uses Controller.lbr.
+    """
+    with open(filename, encoding='utf-8') as fd:
+        for line in fd:
+            if ('<part ' in line or '<element ' in line) and 'library="%s"' % deprecated_library in line:
+                yield dict(attribute_re.findall(line))
+
+
+def needed_items(filename, libraries, package_map, device_map):
+    """Work out which library items must be embedded in a migrated design.
+
+    Returns {library: {section: [names]}} in the order the items should be
+    written.
+    """
+    needed = {}
+
+    def need(library_name, section, name):
+        names = needed.setdefault(library_name, {s: [] for s in sections})[section]
+        if name not in names:
+            names.append(name)
+
+    for reference in find_references(filename):
+        if 'package' in reference and reference['package'] in package_map:
+            library_name, package_name = package_map[reference['package']]
+            need(library_name, 'packages', package_name)
+
+        elif (reference.get('deviceset'), reference.get('device')) in device_map:
+            library_name, deviceset_name = device_map[(reference['deviceset'], reference['device'])][:2]
+            deviceset = libraries[library_name].find('devicesets/deviceset[@name="%s"]' % deviceset_name)
+            for device in deviceset.iterfind('devices/device'):
+                if device.get('package'):
+                    need(library_name, 'packages', device.get('package'))
+            for gate in deviceset.iterfind('gates/gate'):
+                need(library_name, 'symbols', gate.get('symbol'))
+            need(library_name, 'devicesets', deviceset_name)
+
+    return needed
+
+
+def render_items(library, section, names):
+    """Return the XML for the named items of one library section.
+    """
+    xml = []
+
+    for name in names:
+        item = library.find('%s/%s[@name="%s"]' % (section, section[:-1], name))
+        item.tail = '\n'
+        xml.append(ElementTree.tostring(item, encoding='unicode'))
+
+    return ''.join(xml)
+
+
+def render_sections(library, items):
+    """Return the XML for whole library sections holding only items.
+    """
+    xml = []
+
+    for section in sections:
+        if items[section]:
+            xml.append('<%s>\n%s</%s>\n' % (section, render_items(library, section, items[section]), section))
+
+    return ''.join(xml)
+
+
+def rewrite_reference(line, package_map, device_map):
+    """Point a single part or element line at its replacement library.
+    """
+    attributes = dict(attribute_re.findall(line))
+
+    if '<element ' in line and attributes.get('package') in package_map:
+        library_name, package_name = package_map[attributes['package']]
+        line = line.replace(' package="%s"' % attributes['package'], ' package="%s"' % package_name, 1)
+
+    elif '<part ' in line and (attributes.get('deviceset'), attributes.get('device')) in device_map:
+        library_name, deviceset_name, device_name = device_map[(attributes['deviceset'], attributes['device'])][:3]
+        line = line.replace(' deviceset="%s"' % attributes['deviceset'], ' deviceset="%s"' % deviceset_name, 1)
+        line = line.replace(' device="%s"' % attributes['device'], ' device="%s"' % device_name, 1)
+
+    else:
+        return line
+
+    return line.replace(' library="%s"' % deprecated_library, ' library="%s"' % library_name, 1)
+
+
+def migrate(filename, libraries, package_map, device_map):
+    """Rewrite a .sch or .brd file in place. Returns the number of parts moved.
+    """
+    needed = needed_items(filename, libraries, package_map, device_map)
+    pending = {library_name: {s: list(items[s]) for s in sections} for library_name, items in needed.items()}
+    current_library = None
+    migrated = 0
+    temp_filename = filename + '.migrate'
+
+    try:
+        with open(filename, encoding='utf-8') as source, open(temp_filename, 'w', encoding='utf-8') as output:
+            for line in source:
+                library_start = library_start_re.match(line)
+                item_start = item_start_re.match(line)
+                section_end = section_end_re.match(line)
+                todo = pending.get(current_library)
+
+                if library_start:
+                    current_library = library_start.group(1)
+
+                elif todo and item_start and item_start.group(2) in todo[item_start.group(1) + 's']:
+                    todo[item_start.group(1) + 's'].remove(item_start.group(2))
+
+                elif todo and section_end:
+                    output.write(render_items(libraries[current_library], section_end.group(1), todo[section_end.group(1)]))
+                    todo[section_end.group(1)] = []
+
+                elif todo and line.strip() == '</library>':
+                    output.write(render_sections(libraries[current_library], todo))
+                    del pending[current_library]
+
+                elif line.strip() == '</library>':
+                    pending.pop(current_library, None)
+
+                elif line.strip() == '</libraries>':
+                    for library_name in sorted(pending):
+                        output.write('<library name="%s">\n%s</library>\n' % (library_name, render_sections(libraries[library_name], pending[library_name])))
+                    pending = {}
+
+                elif ('<part ' in line or '<element ' in line) and 'library="%s"' % deprecated_library in line:
+                    new_line = rewrite_reference(line, package_map, device_map)
+                    if new_line != line:
+                        migrated += 1
+                        line = new_line
+
+                if line.strip() == '</library>':
+                    current_library = None
+
+                output.write(line)
+
+        os.replace(temp_filename, filename)
+    except BaseException:
+        if os.path.exists(temp_filename):
+            os.remove(temp_filename)
+        raise
+
+    return migrated
+
+
+def describe_package(package_name, package_map, held_packages):
+    """Describe what happens to .brd elements using an old package.
+    """
+    if package_name in package_map:
+        return '%s.lbr %s' % package_map[package_name]
+
+    return held_packages.get(package_name, 'NO REPLACEMENT')
+
+
+def describe_device(old, device_map, held_devices):
+    """Describe what happens to .sch parts using an old (deviceset, device).
+    """
+    if old in device_map:
+        return '%s.lbr %s%s' % device_map[old][:3]
+
+    return held_devices.get(old, 'NO REPLACEMENT')
+
+
+def print_mapping(libraries, package_map, device_map, held_packages, held_devices):
+    """Print the replacement for every Controller.lbr package and device.
+    """
+    controller = libraries[deprecated_library]
+
+    print('*** Packages:')
+    for package in controller.iterfind('packages/package'):
+        print('%s -> %s' % (package.get('name'), describe_package(package.get('name'), package_map, held_packages)))
+
+    print('\n*** Devices:')
+    for deviceset in controller.iterfind('devicesets/deviceset'):
+        for device in deviceset.iterfind('devices/device'):
+            old = (deviceset.get('name'), device.get('name'))
+            print('%s%s -> %s' % (old + (describe_device(old, device_map, held_devices),)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Move .sch and .brd files from Controller.lbr to the new libraries.')
+    parser.add_argument('-l', '--library-dir', default=library_dir, help='Directory containing the .lbr files')
+    parser.add_argument('-m', '--mapping', action='store_true', help='Print the Controller.lbr replacements and exit')
+    parser.add_argument('-n', '--dry-run', action='store_true', help='Show which parts would be migrated without changing any files')
+    parser.add_argument('files', nargs='*', help='.sch and .brd files to migrate in place')
+    args = parser.parse_args()
+
+    libraries = load_libraries(args.library_dir)
+    package_map, device_map, held_packages, held_devices = build_mapping(libraries)
+
+    if args.mapping or not args.files:
+        print_mapping(libraries, package_map, device_map, held_packages, held_devices)
+        sys.exit(0)
+
+    for filename in args.files:
+        if args.dry_run:
+            for reference in find_references(filename):
+                if 'deviceset' in reference:
+                    old = (reference['deviceset'], reference.get('device', ''))
+                    new = describe_device(old, device_map, held_devices)
+                else:
+                    old = (reference.get('package'), '')
+                    new = describe_package(old[0], package_map, held_packages)
+                print('%s: %s %s%s -> %s' % ((filename, reference.get('name')) + old + (new,)))
+        else:
+            print('%s: migrated %s parts' % (filename, migrate(filename, libraries, package_map, device_map)))
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""Serve individual parts and custom mini-libraries over HTTP.
+
+Loading a whole library to pull out a couple of parts is slow, especially for
+the 3 MB Keyboard.lbr. This server loads each library once, the first time it
+is asked for, and keeps the rendered XML for every part it has served in an
+LRU cache limited by size. Keyboard.lbr is not read from disk. It is rendered
+from generate.py and parsed the first time it is asked for, so it always
+matches the generator but that first request takes a few hundred
+milliseconds.
+
+Usage:
+
+    ./server.py                           # Listen on http://127.0.0.1:8000/
+    ./server.py --socket /tmp/eagle.sock  # Listen on a unix socket instead
+
+Requests:
+
+    GET /libraries                        # JSON list of libraries
+    GET /Components                       # JSON list of the parts in a library
+    GET /Components/package/C0603         # A single <package>
+    GET /Components/symbol/CAPACITOR      # A single <symbol>
+    GET /Components/deviceset/CAPACITOR   # A single <deviceset>
+    GET /Components.lbr?deviceset=CAPACITOR&package=R0603
+                                          # A library holding only those parts
+    GET /metrics                          # JSON cache and latency metrics
+
+A mini-library always includes the symbols and packages its devicesets need.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.etree import ElementTree
+
+
+library_dir = os.path.dirname(os.path.abspath(__file__))
+sections = ('packages', 'symbols', 'devicesets')
+library_footer = '</library>\n</drawing>\n</eagle>\n'
+status_text = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+class NotFound(Exception):
+    """Raised when a library or part does not exist.
+    """
+
+
+class FragmentCache(object):
+    """An LRU cache of rendered XML that evicts by total size in bytes.
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.fragments = OrderedDict()
+
+    def get(self, key, render):
+        """Return the cached value for key, calling render() on a miss.
+        """
+        if key in self.fragments:
+            self.hits += 1
+            self.fragments.move_to_end(key)
+            return self.fragments[key]
+
+        self.misses += 1
+        fragment = render()
+        fragment_size = len(fragment.encode('utf-8'))
+
+        if fragment_size <= self.max_bytes:
+            self.fragments[key] = fragment
+            self.size += fragment_size
+
+            while self.size > self.max_bytes:
+                _, evicted = self.fragments.popitem(last=False)
+                self.size -= len(evicted.encode('utf-8'))
+                self.evictions += 1
+
+        return fragment
+
+    def metrics(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'items': len(self.fragments),
+            'bytes': self.size,
+            'max_bytes': self.max_bytes,
+        }
+
+
+def render_keyboard():
+    """Render the full Keyboard.lbr XML from the package model in generate.py.
+    """
+    import generate
+
+    template = generate.build_template(generate.keyboard_sizes)[0]
+    return generate.render_library(template)
+
+
+def parse_library(xml):
+    """Index the parts of a library by section and name.
+
+    Returns a dict with the text before <packages> as 'header' and a
+    {name: element} dict for each section.
+    """
+    library = ElementTree.fromstring(xml).find('drawing/library')
+    parsed = {'header': xml[:xml.index('<packages>')]}
+
+    for section in sections:
+        parsed[section] = OrderedDict((item.get('name'), item) for item in library.iterfind('%s/%s' % (section, section[:-1])))
+
+    return parsed
+
+
+def load_library(name):
+    """Load and index a library by name.
+    """
+    if name == 'Keyboard':
+        return parse_library(render_keyboard())
+
+    filename = os.path.join(library_dir, name + '.lbr')
+    if os.path.sep in name or not os.path.exists(filename):
+        raise NotFound('No such library: %s' % name)
+
+    with open(filename, encoding='utf-8') as fd:
+        return parse_library(fd.read())
+
+
+class FootprintServer(object):
+    """Answer footprint requests from lazily loaded libraries.
+    """
+    def __init__(self, cache_bytes):
+        self.cache = FragmentCache(cache_bytes)
+        self.libraries = {}
+        self.requests = 0
+        self.errors = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    async def library(self, name):
+        """Return the parsed library, loading it in a worker thread the first time.
+
+        Concurrent requests for a library that is still loading wait on the
+        same load instead of starting their own.
+        """
+        if name not in self.libraries:
+            self.libraries[name] = asyncio.get_running_loop().run_in_executor(None, load_library, name)
+
+        try:
+            return await self.libraries[name]
+        except Exception:
+            self.libraries.pop(name, None)
+            raise
+
+    def fragment(self, library_name, library, section, name):
+        """Return the rendered XML for one part.
+        """
+        if name not in library[section]:
+            raise NotFound('No %s named %s in %s' % (section[:-1], name, library_name))
+
+        def render():
+            item = library[section][name]
+            item.tail = '\n'
+            return ElementTree.tostring(item, encoding='unicode')
+
+        return self.cache.get((library_name, section, name), render)
+
+    def mini_library(self, library_name, library, wanted):
+        """Return a complete library containing only the wanted parts.
+
+        wanted is {section: [names]}. The symbols and packages used by any
+        wanted devicesets are added automatically.
+        """
+        wanted = {section: list(wanted.get(section, [])) for section in sections}
+
+        for name in wanted['devicesets']:
+            if name not in library['devicesets']:
+                raise NotFound('No deviceset named %s in %s' % (name, library_name))
+            for gate in library['devicesets'][name].iterfind('gates/gate'):
+                wanted['symbols'].append(gate.get('symbol'))
+            for device in library['devicesets'][name].iterfind('devices/device'):
+                if device.get('package'):
+                    wanted['packages'].append(device.get('package'))
+
+        xml = [library['header']]
+        for section in sections:
+            names = list(OrderedDict.fromkeys(wanted[section]))
+            xml.append('<%s>\n' % section)
+            xml.extend(self.fragment(library_name, library, section, name) for name in names)
+            xml.append('</%s>\n' % section)
+        xml.append(library_footer)
+
+        return ''.join(xml)
+
+    def metrics(self):
+        return {
+            'cache': self.cache.metrics(),
+            'libraries_loaded': sorted(name for name, future in self.libraries.items() if future.done()),
+            'requests': self.requests,
+            'errors': self.errors,
+            'latency_ms': {
+                'mean': 1000 * self.latency_total / self.requests if self.requests else 0.0,
+                'max': 1000 * self.latency_max,
+            },
+        }
+
+    async def route(self, path, query):
+        """Return (content type, body) for a request path.
+        """
+        parts = [unquote(part) for part in path.strip('/').split('/')]
+
+        if parts == ['libraries']:
+            names = sorted(filename[:-4] for filename in os.listdir(library_dir) if filename.endswith('.lbr'))
+            return 'application/json', json.dumps(names)
+
+        if parts == ['metrics']:
+            return 'application/json', json.dumps(self.metrics())
+
+        if len(parts) == 1 and parts[0].endswith('.lbr'):
+            library = await self.library(parts[0][:-4])
+            wanted = {section: query.get(section[:-1], []) for section in sections}
+            return 'application/xml', self.mini_library(parts[0][:-4], library, wanted)
+
+        if len(parts) == 1 and parts[0]:
+            library = await self.library(parts[0])
+            return 'application/json', json.dumps({section: list(library[section]) for section in sections})
+
+        if len(parts) == 3 and parts[1] + 's' in sections:
+            library = await self.library(parts[0])
+            return 'application/xml', self.fragment(parts[0], library, parts[1] + 's', parts[2])
+
+        raise NotFound('Unknown path: %s' % path)
+
+    async def handle(self, reader, writer):
+        """Answer a single HTTP request and close the connection.
+        """
+        start = time.perf_counter()
+        content_type = 'text/plain'
+
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            while (await reader.readline()).strip():
+                pass
+
+            if len(request_line) < 2:
+                status, body = 400, 'Malformed request\n'
+            elif request_line[0] != 'GET':
+                status, body = 405, 'Only GET is supported\n'
+            else:
+                url = urlsplit(request_line[1])
+                content_type, body = await self.route(url.path, parse_qs(url.query))
+                status = 200
+
+        except NotFound as e:
+            status, body = 404, '%s\n' % e
+
+        except Exception as e:
+            status, body = 500, '%s: %s\n' % (e.__class__.__name__, e)
+
+        body = body.encode('utf-8')
+        writer.write(b'HTTP/1.0 %d %s\r\nContent-Type: %s; charset=utf-8\r\nContent-Length: %d\r\n\r\n' % (status, status_text[status].encode('ascii'), content_type.encode('ascii'), len(body)))
+        writer.write(body)
+
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+        elapsed = time.perf_counter() - start
+        self.requests += 1
+        self.errors += status != 200
+        self.latency_total += elapsed
+        self.latency_max = max(self.latency_max, elapsed)
+
+
+async def serve(args):
+    footprint_server = FootprintServer(args.cache_size * 1024 * 1024)
+
+    if args.socket:
+        server = await asyncio.start_unix_server(footprint_server.handle, path=args.socket)
+        print('*** Listening on %s' % args.socket)
+    else:
+        server = await asyncio.start_server(footprint_server.handle, args.host, args.port)
+        print('*** Listening on http://%s:%s/' % (args.host, args.port))
+
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve EAGLE parts and mini-libraries over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('-p', '--port', type=int, default=8000, help='Port to listen on')
+    parser.add_argument('-s', '--socket', help='Listen on this unix socket instead of a TCP port')
+    parser.add_argument('-c', '--cache-size', type=int, default=64, help='Maximum size of the fragment cache in MB')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass